@@ -1,9 +1,8 @@
 from fastapi import APIRouter, HTTPException
-from ....services.visit_counter import VisitCounterService
+from ....services.visit_counter import visit_counter_service as counter_service
 from ....schemas.counter import VisitCount
 
 router = APIRouter()
-counter_service = VisitCounterService()
 
 @router.post("/visit/{page_id}")
 async def record_visit(page_id: str):
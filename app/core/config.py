@@ -8,12 +8,20 @@ class Settings(BaseSettings):
     
     REDIS_PASSWORD: str = ""
     REDIS_DB: int = 0
+    # Max connections per Redis node, per worker process. All coroutines of a
+    # worker share one blocking pool per node: awaits beyond POOL_SIZE wait for
+    # a free connection and fail only after POOL_TIMEOUT, so size it close to
+    # the expected concurrent Redis awaits per worker to avoid queueing.
+    POOL_SIZE: int = 256
+    POOL_TIMEOUT: float = 5.0  # Seconds to wait for a free connection when the pool is full
     
     # Consistent Hashing Configuration
+    HASH_STRATEGY: str = "jump"  # "jump" or "ring" (ring supports arbitrary node removal)
     VIRTUAL_NODES: int = 100
     
     # Batch Processing Configuration
     BATCH_INTERVAL_SECONDS: float = 5.0
+    MICROBATCH_WINDOW_SECONDS: float = 0.0  # e.g. 0.005 to flush writes every 5ms; 0 disables
     
     # Application Configuration
     DEBUG: bool = True
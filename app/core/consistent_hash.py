@@ -1,6 +1,10 @@
-import hashlib
-from typing import List, Dict, Any
+import xxhash
+from typing import List, Dict, Any, Tuple
 from bisect import bisect
+from heapq import merge
+
+# Seed for every hash computed here; fixed so key placement is stable across restarts
+HASH_SEED = 0
 
 class ConsistentHash:
     def __init__(self, nodes: List[str], virtual_nodes: int = 100):
@@ -12,12 +16,17 @@ class ConsistentHash:
             virtual_nodes: Number of virtual nodes per physical node
         """
         self.virtual_nodes = virtual_nodes
-        self.hash_ring = {}  # Maps hash values to node names
-        self.sorted_keys = []  # Sorted list of hash values
+        # The ring is stored as two parallel lists: sorted_keys[i] is the hash
+        # of a virtual node and ring_nodes[i] the physical node it maps to
+        self.sorted_keys: List[int] = []  # Sorted list of hash values
+        self.ring_nodes: List[str] = []  # Node owning each hash in sorted_keys
         
-        # Add each node to the hash ring
+        # Build the virtual nodes of every node up front and sort them once
+        ring: List[Tuple[int, str]] = []
         for node in nodes:
-            self.add_node(node)
+            ring.extend(self._virtual_nodes(node))
+        ring.sort()
+        self._set_ring(ring)
 
     def add_node(self, node: str) -> None:
         """
@@ -26,19 +35,23 @@ class ConsistentHash:
         Args:
             node: Node identifier to add
         """
-        # Create virtual nodes for the physical node
-        for i in range(self.virtual_nodes):
-            # Create a unique key for each virtual node
-            virtual_node_key = f"{node}:{i}"
-            # Calculate the hash of the virtual node
-            hash_value = self._hash(virtual_node_key)
-            # Map the hash to the physical node
-            self.hash_ring[hash_value] = node
-            # Add the hash to the sorted keys
-            self.sorted_keys.append(hash_value)
-        
-        # Keep the keys sorted for binary search
-        self.sorted_keys.sort()
+        # Sort only the new virtual nodes, then merge them into the sorted ring
+        new_entries = sorted(self._virtual_nodes(node))
+        ring = list(merge(zip(self.sorted_keys, self.ring_nodes), new_entries))
+        self._set_ring(ring)
+
+    def _virtual_nodes(self, node: str) -> List[Tuple[int, str]]:
+        """
+        Create the virtual nodes for a physical node
+        
+        Args:
+            node: Node identifier
+            
+        Returns:
+            Unsorted list of (hash_value, node) pairs
+        """
+        # Each virtual node is keyed by "<node>:<index>"
+        return [(self._hash(f"{node}:{i}"), node) for i in range(self.virtual_nodes)]
 
     def remove_node(self, node: str) -> None:
         """
@@ -47,16 +60,27 @@ class ConsistentHash:
         Args:
             node: Node identifier to remove
         """
-        # Find all virtual nodes for this physical node
-        keys_to_remove = []
-        for hash_value, mapped_node in self.hash_ring.items():
-            if mapped_node == node:
-                keys_to_remove.append(hash_value)
+        # Virtual node hashes are deterministic, so recompute them instead of
+        # scanning the ring for entries mapped to this node
+        hashes_to_remove = {hash_value for hash_value, _ in self._virtual_nodes(node)}
+        
+        # Drop them from both parallel lists in a single pass
+        ring = [
+            (hash_value, mapped_node)
+            for hash_value, mapped_node in zip(self.sorted_keys, self.ring_nodes)
+            if hash_value not in hashes_to_remove or mapped_node != node
+        ]
+        self._set_ring(ring)
+
+    def _set_ring(self, ring: List[Tuple[int, str]]) -> None:
+        """
+        Replace the ring contents
         
-        # Remove the virtual nodes
-        for hash_value in keys_to_remove:
-            del self.hash_ring[hash_value]
-            self.sorted_keys.remove(hash_value)
+        Args:
+            ring: Sorted list of (hash_value, node) pairs
+        """
+        self.sorted_keys = [hash_value for hash_value, _ in ring]
+        self.ring_nodes = [node for _, node in ring]
 
     def get_node(self, key: str) -> str:
         """
@@ -68,17 +92,20 @@ class ConsistentHash:
         Returns:
             The node responsible for the key
         """
-        if not self.hash_ring:
+        if not self.sorted_keys:
             raise Exception("Hash ring is empty")
         
-        # Calculate the hash of the key
-        hash_value = self._hash(key)
+        # Calculate the hash of the key (inlined _hash, this runs on every lookup)
+        hash_value = xxhash.xxh3_64_intdigest(key, seed=HASH_SEED)
         
-        # Find the first node in the ring that comes after the key's hash
-        index = bisect(self.sorted_keys, hash_value) % len(self.sorted_keys)
+        # Find the first node in the ring that comes after the key's hash,
+        # wrapping around to the first node past the end of the ring
+        index = bisect(self.sorted_keys, hash_value)
+        if index == len(self.sorted_keys):
+            index = 0
         
         # Return the node at that position
-        return self.hash_ring[self.sorted_keys[index]]
+        return self.ring_nodes[index]
     
     def _hash(self, key: str) -> int:
         """
@@ -90,8 +117,62 @@ class ConsistentHash:
         Returns:
             The hash value as an integer
         """
-        # Use MD5 for consistent hashing
-        md5 = hashlib.md5()
-        md5.update(key.encode('utf-8'))
-        return int(md5.hexdigest(), 16)
-    
\ No newline at end of file
+        # xxh3 is only used to spread keys over the ring, so a fast
+        # non-cryptographic 64-bit hash is enough
+        return xxhash.xxh3_64_intdigest(key, seed=HASH_SEED)
+    
+
+class JumpHash:
+    def __init__(self, nodes: List[str]):
+        """
+        Initialize the jump consistent hash (Lamping & Veach)
+        
+        Jump hash needs no ring, so lookups are O(log n) integer steps with no
+        per-node memory. Nodes can only be added or removed at the end of the
+        list without remapping keys of the other nodes; use ConsistentHash when
+        arbitrary membership changes are needed.
+        
+        Args:
+            nodes: List of node identifiers (parsed from comma-separated string)
+        """
+        self.nodes: List[str] = list(nodes)
+
+    def add_node(self, node: str) -> None:
+        """
+        Add a new node as the last bucket
+        
+        Args:
+            node: Node identifier to add
+        """
+        self.nodes.append(node)
+
+    def remove_node(self, node: str) -> None:
+        """
+        Remove a node from the bucket list
+        
+        Args:
+            node: Node identifier to remove
+        """
+        self.nodes.remove(node)
+
+    def get_node(self, key: str) -> str:
+        """
+        Get the node responsible for the given key
+        
+        Args:
+            key: The key to look up
+            
+        Returns:
+            The node responsible for the key
+        """
+        num_buckets = len(self.nodes)
+        if not num_buckets:
+            raise Exception("Node list is empty")
+        
+        key_hash = xxhash.xxh3_64_intdigest(key, seed=HASH_SEED)
+        bucket, j = -1, 0
+        while j < num_buckets:
+            bucket = j
+            key_hash = (key_hash * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+            j = int((bucket + 1) * ((1 << 31) / ((key_hash >> 33) + 1)))
+        return self.nodes[bucket]
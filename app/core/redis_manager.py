@@ -1,29 +1,93 @@
-import redis
-from typing import Dict, List, Optional, Any
-from .consistent_hash import ConsistentHash
+import logging
+import redis.asyncio as aioredis
+from typing import Dict, List, Optional, Any, Tuple
+from .consistent_hash import ConsistentHash, JumpHash
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
+ROUTE_CACHE_MAX_SIZE = 100_000
+
+def _parse_counter(response: Optional[bytes]) -> int:
+    """Convert a raw GET reply to a counter value, treating a missing key as 0"""
+    return int(response) if response is not None else 0
+
 class RedisManager:
     def __init__(self):
         """Initialize Redis connection pools and consistent hashing"""
-        self.connection_pools: Dict[str, redis.ConnectionPool] = {}
-        self.redis_clients: Dict[str, redis.Redis] = {}
+        self.connection_pools: Dict[str, aioredis.ConnectionPool] = {}
+        self.redis_clients: Dict[str, aioredis.Redis] = {}
+        
+        # Route cache: key -> (node, redis_client). Cleared by add_node and
+        # remove_node whenever the topology changes.
+        self._route_cache: Dict[str, Tuple[str, aioredis.Redis]] = {}
         
         # Parse Redis nodes from comma-separated string
         redis_nodes = [node.strip() for node in settings.REDIS_NODES.split(",") if node.strip()]
-        self.consistent_hash = ConsistentHash(redis_nodes, settings.VIRTUAL_NODES)
+        if settings.HASH_STRATEGY == "ring":
+            self.consistent_hash = ConsistentHash(redis_nodes, settings.VIRTUAL_NODES)
+        elif settings.HASH_STRATEGY == "jump":
+            self.consistent_hash = JumpHash(redis_nodes)
+        else:
+            raise ValueError(f"Unknown HASH_STRATEGY {settings.HASH_STRATEGY!r}, expected 'jump' or 'ring'")
         
         # Initialize connection pools for each Redis node
         for node in redis_nodes:
-            self.connection_pools[node] = redis.ConnectionPool.from_url(
-                url=node,
-                password=settings.REDIS_PASSWORD,
-                db=settings.REDIS_DB,
-                decode_responses=True
-            )
-            self.redis_clients[node] = redis.Redis(connection_pool=self.connection_pools[node])
+            self._create_client(node)
+
+    def _create_client(self, node: str) -> None:
+        """
+        Create the connection pool and Redis client for a node
+        
+        Args:
+            node: Redis URL of the node
+        """
+        # Blocking pool: when all connections are busy, callers wait up to
+            # POOL_TIMEOUT seconds for one instead of failing immediately
+        self.connection_pools[node] = aioredis.BlockingConnectionPool.from_url(
+            url=node,
+            password=settings.REDIS_PASSWORD,
+            db=settings.REDIS_DB,
+            decode_responses=False,  # Counters are parsed straight from bytes
+            max_connections=settings.POOL_SIZE,
+            timeout=settings.POOL_TIMEOUT
+        )
+        redis_client = aioredis.Redis(connection_pool=self.connection_pools[node])
+        # Only counters are read with GET, so convert replies to int in the parser
+        redis_client.set_response_callback("GET", _parse_counter)
+        self.redis_clients[node] = redis_client
+
+    def add_node(self, node: str) -> None:
+        """
+        Add a Redis node and route keys to it
+        
+        Args:
+            node: Redis URL of the node to add
+        """
+        if node in self.redis_clients:
+            raise ValueError(f"Redis node {node} is already registered")
+        self._create_client(node)
+        self.consistent_hash.add_node(node)
+        # Cached routes may now point at the wrong node
+        self._route_cache.clear()
+
+    async def remove_node(self, node: str) -> None:
+        """
+        Stop routing keys to a Redis node and close its connections
+        
+        Args:
+            node: Redis URL of the node to remove
+        """
+        if node not in self.redis_clients:
+            raise ValueError(f"Redis node {node} is not registered")
+        self.consistent_hash.remove_node(node)
+        self._route_cache.clear()
+        
+        redis_client = self.redis_clients.pop(node)
+        del self.connection_pools[node]
+        await redis_client.aclose(close_connection_pool=True)
 
-    async def get_connection(self, key: str) -> redis.Redis:
+    async def get_connection(self, key: str) -> aioredis.Redis:
         """
         Get Redis connection for the given key using consistent hashing
         
@@ -33,10 +97,32 @@ class RedisManager:
         Returns:
             Redis client for the appropriate node
         """
+        return self._route(key)[1]
+
+    def _route(self, key: str) -> Tuple[str, aioredis.Redis]:
+        """
+        Resolve the node and Redis client owning a key, memoizing the result
+        
+        Args:
+            key: The key to route
+            
+        Returns:
+            Tuple of (node, redis_client)
+        """
+        hit = self._route_cache.get(key)
+        if hit is not None:
+            return hit
+        
         node = self.consistent_hash.get_node(key)
         if node not in self.redis_clients:
             raise Exception(f"No Redis client available for node {node}")
-        return self.redis_clients[node]
+        
+        # Keep the cache bounded under high-cardinality key streams
+        if len(self._route_cache) >= ROUTE_CACHE_MAX_SIZE:
+            self._route_cache.clear()
+        route = (node, self.redis_clients[node])
+        self._route_cache[key] = route
+        return route
 
     async def increment(self, key: str, amount: int = 1) -> int:
         """
@@ -51,12 +137,55 @@ class RedisManager:
         """
         try:
             redis_client = await self.get_connection(key)
-            return redis_client.incrby(key, amount)
+            return await redis_client.incrby(key, amount)
         except Exception as e:
             # In a production system, you might want to implement retries here
             raise Exception(f"Failed to increment key {key}: {str(e)}")
 
-    async def get(self, key: str) -> Optional[int]:
+    async def pipeline_increment(self, items: Dict[str, int]) -> Dict[str, int]:
+        """
+        Increment many counters in Redis using one pipeline per node
+        
+        Args:
+            items: Mapping of key -> amount to increment by
+            
+        Returns:
+            Mapping of key -> amount for the increments that could not be applied
+        """
+        # Group the keys by the node that owns them
+        node_items: Dict[str, Dict[str, int]] = {}
+        failed: Dict[str, int] = {}
+        for key, amount in items.items():
+            try:
+                node = self._route(key)[0]
+            except Exception as e:
+                logger.error(f"Failed to route key {key}: {str(e)}")
+                failed[key] = amount
+                continue
+            node_items.setdefault(node, {})[key] = amount
+        
+        for node, group in node_items.items():
+            try:
+                redis_client = self.redis_clients[node]
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for key, amount in group.items():
+                        pipe.incrby(key, amount)
+                    # Collect per-command errors instead of raising the first one,
+                    # so increments that were applied aren't retried
+                    results = await pipe.execute(raise_on_error=False)
+            except Exception as e:
+                # Connection-level failure before any reply: retry the whole group
+                logger.error(f"Failed to flush {len(group)} keys to node {node}: {str(e)}")
+                failed.update(group)
+                continue
+            
+            for (key, amount), result in zip(group.items(), results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to increment key {key}: {str(result)}")
+                    failed[key] = amount
+        return failed
+
+    async def get(self, key: str) -> int:
         """
         Get value for a key from Redis
         
@@ -64,15 +193,20 @@ class RedisManager:
             key: The key to get
             
         Returns:
-            Value of the key or None if not found
+            Value of the key or 0 if not found
         """
         try:
             redis_client = await self.get_connection(key)
-            value = redis_client.get(key)
-            return int(value) if value is not None else 0
+            return await redis_client.get(key)
         except Exception as e:
             # In a production system, you might want to implement retries here
             raise Exception(f"Failed to get key {key}: {str(e)}")
 
+    async def close(self) -> None:
+        """Close all Redis clients and release their connection pools"""
+        for redis_client in self.redis_clients.values():
+            # Clients built on an explicit pool don't close it by default
+            await redis_client.aclose(close_connection_pool=True)
+
 # Create a singleton instance
 redis_manager = RedisManager()
@@ -1,9 +1,14 @@
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
 from .api.v1.api import api_router
+from .core.redis_manager import redis_manager
 from .services.visit_counter import visit_counter_service
 
+# Configure logging once for the whole application
+logging.basicConfig(level=logging.INFO)
+
 app = FastAPI(title="Visit Counter Service")
 
 # CORS middleware configuration
@@ -19,10 +24,16 @@ app.add_middleware(
 async def health_check():
     return {"status": "healthy"}
 
+@app.on_event("startup")
+async def startup_event():
+    """Start background tasks once the event loop is running"""
+    await visit_counter_service.start()
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources when the application shuts down"""
     await visit_counter_service.cleanup()
+    await redis_manager.close()
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_PREFIX) 
\ No newline at end of file
@@ -2,8 +2,6 @@ import time
 import logging
 from typing import Dict, Any, Tuple
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class CacheService:
@@ -16,7 +14,7 @@ class CacheService:
         """
         self.cache: Dict[str, Tuple[Any, float]] = {}  # key -> (value, expiration_timestamp)
         self.ttl_seconds = ttl_seconds
-        print(f"Cache service initialized with TTL of {ttl_seconds} seconds")
+        logger.info("Cache service initialized with TTL of %s seconds", ttl_seconds)
     
     def set(self, key: str, value: Any) -> None:
         """
@@ -28,7 +26,8 @@ class CacheService:
         """
         expiration = time.time() + self.ttl_seconds
         self.cache[key] = (value, expiration)
-        print(f"Cache SET: {key} = {value} (expires in {self.ttl_seconds} seconds)")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Cache SET: %s = %s (expires in %s seconds)", key, value, self.ttl_seconds)
     
     def get(self, key: str) -> Tuple[Any, bool]:
         """
@@ -41,7 +40,8 @@ class CacheService:
             Tuple of (value, hit_status) where hit_status is True if cache hit, False if miss
         """
         if key not in self.cache:
-            print(f"Cache MISS (key not found): {key}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Cache MISS (key not found): %s", key)
             return None, False
         
         value, expiration = self.cache[key]
@@ -50,10 +50,12 @@ class CacheService:
         if time.time() > expiration:
             # Remove expired item
             del self.cache[key]
-            print(f"Cache MISS (expired): {key}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Cache MISS (expired): %s", key)
             return None, False
         
-        print(f"Cache HIT: {key} = {value}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Cache HIT: %s = %s", key, value)
         return value, True
     
     def invalidate(self, key: str) -> None:
@@ -65,12 +67,13 @@ class CacheService:
         """
         if key in self.cache:
             del self.cache[key]
-            print(f"Cache INVALIDATED: {key}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Cache INVALIDATED: %s", key)
     
     def clear(self) -> None:
         """Clear all cache entries"""
         self.cache.clear()
-        print("Cache CLEARED")
+        logger.debug("Cache CLEARED")
 
 # Create a singleton instance
 cache_service = CacheService() 
\ No newline at end of file
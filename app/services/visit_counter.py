@@ -1,32 +1,91 @@
-from typing import Dict, DefaultDict
+from typing import Dict, DefaultDict, Optional, Set
 import logging
 import time
 import asyncio
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from ..core.config import settings
 from ..core.redis_manager import redis_manager
 from ..schemas.counter import VisitCount
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CACHE_MAX_SIZE = 100_000  # Max pages kept in the in-memory read cache
+
 class VisitCounterService:
     def __init__(self):
         """Initialize the visit counter service with Redis backend, in-memory cache, and write batching"""
-        # In-memory cache: page_id -> (count, expiration_timestamp)
-        self.cache: Dict[str, tuple[int, float]] = {}
+        # In-memory cache split into two dicts to avoid a tuple per entry:
+        # page_id -> count and page_id -> expiration (time.monotonic_ns()).
+        # _counts is kept in LRU order and bounded by CACHE_MAX_SIZE.
+        self._counts: OrderedDict[str, int] = OrderedDict()
+        self._exp_ns: Dict[str, int] = {}
         self.cache_ttl = 5.0  # 5 seconds TTL
         
+        # In-flight Redis reads: page_id -> task resolving to the Redis count
+        self._inflight: Dict[str, asyncio.Task] = {}
+        
+        # Pages with reads in progress: page_id -> number of readers, and
+        # page_id -> generation bumped by every invalidation during those reads
+        self._readers: Dict[str, int] = {}
+        self._generations: Dict[str, int] = {}
+        
         # Write batching buffer: page_id -> pending_count
         self.write_buffer: DefaultDict[str, int] = defaultdict(int)
-        self.last_flush_time = time.time()
+        self._swap_lock = asyncio.Lock()
+        self.last_flush_ns = time.monotonic_ns()
         self.flush_interval = 30.0  # 30 seconds between flushes
         
-        # Start background flush task
-        self.flush_task = asyncio.create_task(self._periodic_flush())
+        # Optional micro-batching: flush shortly after the first buffered write
+        self.microbatch_window = settings.MICROBATCH_WINDOW_SECONDS
+        self._flush_scheduled = False
+        self._microbatch_tasks: Set[asyncio.Task] = set()
+        
+        # Background flush task, created by start() on the running event loop
+        self.flush_task: Optional[asyncio.Task] = None
         
         logger.info("VisitCounterService initialized with write batching (flush interval: 30s)")
 
+    async def start(self):
+        """Start the background flush task on the running event loop"""
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._periodic_flush())
+
+    def _invalidate(self, page_id: str) -> None:
+        """Drop the cached count for a page, if any"""
+        self._exp_ns.pop(page_id, None)
+        self._counts.pop(page_id, None)
+        # Tell reads in progress that their result must not be cached
+        if page_id in self._readers:
+            self._generations[page_id] = self._generations.get(page_id, 0) + 1
+
+    async def _get_redis_count(self, page_id: str) -> int:
+        """
+        Read a page's persisted count, sharing one Redis GET between concurrent callers.
+        
+        Args:
+            page_id: Unique identifier for the page.
+            
+        Returns:
+            int: The count stored in Redis.
+        """
+        task = self._inflight.get(page_id)
+        if task is None:
+            # Run the GET in its own task so cancelling one caller doesn't
+            # cancel the read for every other caller waiting on it
+            task = asyncio.ensure_future(redis_manager.get(f"visit_counter:{page_id}"))
+            self._inflight[page_id] = task
+            task.add_done_callback(lambda t: self._finish_read(page_id, t))
+        return await asyncio.shield(task)
+
+    def _finish_read(self, page_id: str, task: asyncio.Task) -> None:
+        """Done callback for an in-flight Redis read"""
+        # The entry may already point at a newer read started after a flush
+        if self._inflight.get(page_id) is task:
+            del self._inflight[page_id]
+        # Mark any error as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
     async def _periodic_flush(self):
         """Background task to periodically flush the write buffer to Redis"""
         while True:
@@ -39,39 +98,74 @@ class VisitCounterService:
             except Exception as e:
                 logger.error(f"Error in periodic flush: {str(e)}")
     
-    async def flush_buffer(self):
-        """Flush all pending writes in the buffer to Redis"""
-        if not self.write_buffer:
-            logger.info("Write buffer is empty, nothing to flush")
+    async def _microbatch_flusher(self):
+        """Flush the writes collected during one micro-batch window"""
+        try:
+            await asyncio.sleep(self.microbatch_window)
+        finally:
+            self._flush_scheduled = False
+        # Micro-batch flushes can run every few milliseconds, keep them at DEBUG
+        await self.flush_buffer(log_level=logging.DEBUG)
+
+    def _schedule_microbatch_flush(self) -> None:
+        """Start a micro-batch flush unless one is already pending"""
+        if self._flush_scheduled:
             return
+        self._flush_scheduled = True
+        task = asyncio.create_task(self._microbatch_flusher())
+        # Keep a reference so the task isn't garbage collected while pending
+        self._microbatch_tasks.add(task)
+        task.add_done_callback(self._microbatch_tasks.discard)
+
+    async def flush_buffer(self, log_level: int = logging.INFO):
+        """
+        Flush all pending writes in the buffer to Redis
         
-        logger.info(f"Flushing write buffer with {len(self.write_buffer)} entries")
+        Args:
+            log_level: Level for the flush progress messages.
+        """
+        if not self.write_buffer:
+            logger.debug("Write buffer is empty, nothing to flush")
+            return
         
-        # Create a copy of the buffer to work with
-        buffer_copy = dict(self.write_buffer)
+        logger.log(log_level, "Flushing write buffer with %s entries", len(self.write_buffer))
         
-        # Clear the original buffer
-        self.write_buffer.clear()
+        # Swap in a fresh buffer so increments made while flushing are kept
+        async with self._swap_lock:
+            buffer_copy, self.write_buffer = self.write_buffer, defaultdict(int)
         
-        # Update Redis for each page in the buffer
+        # Build each Redis key once, remembering its page for the merge-back
+        key_pages: Dict[str, str] = {}
+        pending: Dict[str, int] = {}
         for page_id, count in buffer_copy.items():
             if count > 0:
                 redis_key = f"visit_counter:{page_id}"
-                try:
-                    # Increment Redis by the accumulated count
-                    await redis_manager.increment(redis_key, count)
-                    logger.info(f"Flushed {count} visits for {page_id} to Redis")
-                    
-                    # Invalidate cache for this page
-                    if page_id in self.cache:
-                        del self.cache[page_id]
-                except Exception as e:
-                    # If there's an error, put the count back in the buffer
-                    logger.error(f"Error flushing {page_id} to Redis: {str(e)}")
-                    self.write_buffer[page_id] += count
-        
-        self.last_flush_time = time.time()
-        logger.info("Buffer flush completed")
+                key_pages[redis_key] = page_id
+                pending[redis_key] = count
+        
+        # Send all pending increments in one pipeline per Redis node
+        try:
+            failed = await redis_manager.pipeline_increment(pending)
+        except Exception as e:
+            logger.error(f"Error flushing write buffer to Redis: {str(e)}")
+            failed = pending
+        
+        for redis_key, count in failed.items():
+            # If there's an error, put the count back in the buffer
+            self.write_buffer[key_pages[redis_key]] += count
+        
+        for redis_key, page_id in key_pages.items():
+            if redis_key not in failed:
+                # Invalidate cache for this page, and make later readers issue a
+                # fresh GET instead of joining one sent before this flush landed
+                self._invalidate(page_id)
+                self._inflight.pop(page_id, None)
+        
+        if failed:
+            logger.error(f"Failed to flush {len(failed)} pages to Redis, kept in buffer for retry")
+        
+        self.last_flush_ns = time.monotonic_ns()
+        logger.log(log_level, "Buffer flush completed")
 
     async def increment_visit(self, page_id: str) -> None:
         """
@@ -82,11 +176,14 @@ class VisitCounterService:
         """
         # Add to the write buffer instead of writing directly to Redis
         self.write_buffer[page_id] += 1
-        logger.info(f"Incremented visit count for {page_id} in write buffer (pending: {self.write_buffer[page_id]})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Incremented visit count for %s in write buffer (pending: %s)", page_id, self.write_buffer[page_id])
         
         # Invalidate the cache entry for this page
-        if page_id in self.cache:
-            del self.cache[page_id]
+        self._invalidate(page_id)
+        
+        if self.microbatch_window > 0:
+            self._schedule_microbatch_flush()
 
     async def get_visit_count(self, page_id: str) -> VisitCount:
         """
@@ -98,40 +195,65 @@ class VisitCounterService:
         Returns:
             VisitCount: Current visit count with source information.
         """
-        current_time = time.time()
+        now = time.monotonic_ns()
         
         # Check if we have a valid cache entry
-        if page_id in self.cache:
-            count, expiration = self.cache[page_id]
-            
-            # If the cache entry is still valid
-            if current_time < expiration:
-                logger.info(f"Cache hit for {page_id}: {count}")
+        try:
+            if now < self._exp_ns[page_id]:
+                count = self._counts[page_id]
+                self._counts.move_to_end(page_id)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Cache hit for %s: %s", page_id, count)
                 return VisitCount(visits=count, served_via="in_memory")
             
             # If expired, remove it
-            del self.cache[page_id]
+            self._invalidate(page_id)
+        except KeyError:
+            pass
         
         # If it's been a long time since the last flush, flush now
-        time_since_flush = current_time - self.last_flush_time
-        if time_since_flush > self.flush_interval:
-            logger.info(f"Flush interval exceeded ({time_since_flush:.1f}s), flushing buffer before read")
+        time_since_flush_ns = now - self.last_flush_ns
+        if time_since_flush_ns > self.flush_interval * 1e9:
+            logger.info(f"Flush interval exceeded ({time_since_flush_ns / 1e9:.1f}s), flushing buffer before read")
             await self.flush_buffer()
         
-        # Get the persisted count from Redis
-        redis_key = f"visit_counter:{page_id}"
-        redis_count = await redis_manager.get(redis_key)
-        logger.info(f"Retrieved count {redis_count} for {page_id} from Redis")
+        # Get the persisted count from Redis, noting the page's generation so
+        # an invalidation during the read can be detected
+        self._readers[page_id] = self._readers.get(page_id, 0) + 1
+        generation = self._generations.get(page_id, 0)
+        try:
+            redis_count = await self._get_redis_count(page_id)
+        finally:
+            invalidated = self._generations.get(page_id, 0) != generation
+            readers = self._readers[page_id] - 1
+            if readers:
+                self._readers[page_id] = readers
+            else:
+                del self._readers[page_id]
+                self._generations.pop(page_id, None)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Retrieved count %s for %s from Redis", redis_count, page_id)
         
         # Add any pending writes from the buffer
         pending_count = self.write_buffer.get(page_id, 0)
         total_count = redis_count + pending_count
         
-        if pending_count > 0:
-            logger.info(f"Added {pending_count} pending writes for {page_id}, total: {total_count}")
+        if pending_count > 0 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Added %s pending writes for %s, total: %s", pending_count, page_id, total_count)
+        
+        # A count read across an invalidation may be stale, don't cache it
+        if invalidated:
+            return VisitCount(visits=total_count, served_via="redis")
         
         # Update the cache with the combined count
-        self.cache[page_id] = (total_count, current_time + self.cache_ttl)
+        self._counts[page_id] = total_count
+        self._counts.move_to_end(page_id)
+        self._exp_ns[page_id] = now + int(self.cache_ttl * 1e9)
+        
+        # Evict the least recently used page once the cache is full
+        if len(self._counts) > CACHE_MAX_SIZE:
+            evicted, _ = self._counts.popitem(last=False)
+            self._exp_ns.pop(evicted, None)
         
         # Return the total count with Redis as the source
         return VisitCount(visits=total_count, served_via="redis")
@@ -139,13 +261,17 @@ class VisitCounterService:
     async def cleanup(self):
         """Clean up resources when shutting down"""
         # Cancel the periodic flush task
-        if hasattr(self, 'flush_task'):
+        if self.flush_task is not None:
             self.flush_task.cancel()
             try:
                 await self.flush_task
             except asyncio.CancelledError:
                 pass
         
+        # Let pending micro-batch flushes finish; cancelling one mid-flush
+        # would drop the buffer it already swapped out
+        await asyncio.gather(*self._microbatch_tasks, return_exceptions=True)
+        
         # Flush any remaining writes
         await self.flush_buffer()
 